@@ -1,6 +1,9 @@
 import asyncio
 import sys
 import os
+import time
+from collections import OrderedDict
+from collections.abc import AsyncIterator
 from typing import Annotated
 from dotenv import load_dotenv
 
@@ -10,6 +13,7 @@ from azure.identity.aio import ClientSecretCredential
 from azure.search.documents.aio import SearchClient
 from azure.search.documents.indexes.aio import SearchIndexClient
 from azure.core.credentials import AzureKeyCredential
+from pydantic import PrivateAttr
 
 from semantic_kernel.agents import Agent, AzureAIAgent, AzureAIAgentSettings, ChatCompletionAgent, GroupChatOrchestration
 from semantic_kernel.agents.orchestration.group_chat import BooleanResult, GroupChatManager, MessageResult, StringResult
@@ -50,7 +54,9 @@ class AzureAISearchPlugin:
         search_endpoint: str | None = None,
         api_key: str | None = None,
         index_name: str | None = None,
-        env_file_path: str | None = None
+        env_file_path: str | None = None,
+        cache_size: int = 256,
+        cache_ttl_seconds: float = 3600
     ):
         """Initialize the Azure AI Search plugin.
         
@@ -59,6 +65,8 @@ class AzureAISearchPlugin:
             api_key: Azure AI Search API key
             index_name: Name of the search index
             env_file_path: Path to environment file
+            cache_size: Maximum number of search results kept in the in-memory cache
+            cache_ttl_seconds: Seconds a cached search result stays valid
         """
         # Get values from parameters or environment variables
         endpoint_val = search_endpoint or os.getenv("AZURE_AI_SEARCH_ENDPOINT")
@@ -76,6 +84,11 @@ class AzureAISearchPlugin:
         self.endpoint = endpoint_val
         self.api_key = api_key_val
         self.index_name = index_name_val
+        self.cache_size = cache_size
+        self.cache_ttl_seconds = cache_ttl_seconds
+        
+        # Recent search results keyed on (normalized query, top_k), least recently used first
+        self._search_cache: OrderedDict[tuple[str, int], tuple[float, str]] = OrderedDict()
         
         # Initialize Azure AI Search client
         credential = AzureKeyCredential(api_key_val)
@@ -86,6 +99,49 @@ class AzureAISearchPlugin:
             credential=credential
         )
     
+    @staticmethod
+    def _result_field(result: dict, *fields: str) -> str:
+        """Return the first of the given fields present in a search result.
+
+        The whole result is only stringified when none of the fields exist.
+        """
+        for field in fields:
+            if field in result:
+                return result[field]
+        return str(result)
+    
+    @staticmethod
+    async def _take(results: AsyncIterator[dict], limit: int) -> AsyncIterator[dict]:
+        """Yield at most limit search results without paging past them."""
+        if limit <= 0:
+            return
+        async for result in results:
+            yield result
+            limit -= 1
+            if limit == 0:
+                break
+    
+    def _get_cached_search(self, key: tuple[str, int]) -> str | None:
+        """Return a cached search result if it is still fresh."""
+        cached = self._search_cache.get(key)
+        if cached is None:
+            return None
+        
+        cached_at, response = cached
+        if time.monotonic() - cached_at >= self.cache_ttl_seconds:
+            del self._search_cache[key]
+            return None
+        
+        self._search_cache.move_to_end(key)
+        return response
+    
+    def _cache_search(self, key: tuple[str, int], response: str) -> None:
+        """Store a search result, evicting the least recently used entry when full."""
+        self._search_cache[key] = (time.monotonic(), response)
+        self._search_cache.move_to_end(key)
+        if len(self._search_cache) > self.cache_size:
+            self._search_cache.popitem(last=False)
+    
     @kernel_function(
         name="search_knowledge_base",
         description="Search the Azure AI Search knowledge base for relevant information"
@@ -96,6 +152,11 @@ class AzureAISearchPlugin:
         top_k: Annotated[int, "The number of top results to return"] = 5
     ) -> Annotated[str, "The search results formatted as a string"]:
         """Search the Azure AI Search knowledge base and return formatted results."""
+        cache_key = (query.strip().lower(), top_k)
+        cached = self._get_cached_search(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
             # Perform the search
             results = await self.search_client.search(
@@ -104,18 +165,19 @@ class AzureAISearchPlugin:
                 include_total_count=True
             )
             
-            # Format results
-            formatted_results = []
-            async for result in results:
-                # Extract relevant fields (adjust based on your index schema)
-                content = result.get("content", result.get("text", str(result)))
-                score = result.get("@search.score", "N/A")
-                formatted_results.append(f"Score: {score} - {content}")
+            # Format results, extracting relevant fields (adjust based on your index schema)
+            formatted_results = [
+                f"Score: {result.get('@search.score', 'N/A')} - {self._result_field(result, 'content', 'text')}"
+                async for result in self._take(results, top_k)
+            ]
             
             if not formatted_results:
-                return "No relevant information found in the knowledge base."
+                response = "No relevant information found in the knowledge base."
+            else:
+                response = "Knowledge Base Search Results:\n" + "\n\n".join(formatted_results)
             
-            return "Knowledge Base Search Results:\n" + "\n\n".join(formatted_results)
+            self._cache_search(cache_key, response)
+            return response
             
         except Exception as e:
             return f"Error searching knowledge base: {str(e)}"
@@ -137,11 +199,11 @@ class AzureAISearchPlugin:
                 top=suggestion_count
             )
             
-            suggestions = []
-            async for result in results:
-                # Extract title or first few words as suggestion
-                title = result.get("title", result.get("content", str(result))[:50])
-                suggestions.append(title)
+            # Extract title or first few words as suggestion
+            suggestions = [
+                result["title"] if "title" in result else self._result_field(result, "content")[:50]
+                async for result in self._take(results, suggestion_count)
+            ]
             
             if not suggestions:
                 return "No suggestions available for this query."
@@ -151,95 +213,91 @@ class AzureAISearchPlugin:
         except Exception as e:
             return f"Error getting suggestions: {str(e)}"
 
+_shared_chat_service: AzureChatCompletion | None = None
+
+def _get_chat_service() -> AzureChatCompletion:
+    """Return the chat completion service shared by every agent and the manager.
+
+    The service is created on first use from the environment loaded above, so all
+    participants reuse a single client and its connection pool.
+    """
+    global _shared_chat_service
+    if _shared_chat_service is None:
+        _shared_chat_service = AzureChatCompletion()
+    return _shared_chat_service
+
+_DEBATE_SUFFIX = "You are in a debate. Feel free to challenge the other participants with respect."
+
+# (name, description, persona) for each debate participant; the debate suffix is appended to every persona.
+_PERSONAS: tuple[tuple[str, str, str], ...] = (
+    (
+        "Farmer",
+        "A rural farmer from Southeast Asia.",
+        "You're a farmer from Southeast Asia. "
+        "Your life is deeply connected to land and family. "
+        "You value tradition and sustainability. ",
+    ),
+    (
+        "Developer",
+        "An urban software developer from the United States.",
+        "You're a software developer from the United States. "
+        "Your life is fast-paced and technology-driven. "
+        "You value innovation, freedom, and work-life balance. ",
+    ),
+    (
+        "Teacher",
+        "A retired history teacher from Eastern Europe",
+        "You're a retired history teacher from Eastern Europe. "
+        "You bring historical and philosophical perspectives to discussions. "
+        "You value legacy, learning, and cultural continuity. ",
+    ),
+    (
+        "Activist",
+        "A young activist from South America.",
+        "You're a young activist from South America. "
+        "You focus on social justice, environmental rights, and generational change. ",
+    ),
+    (
+        "SpiritualLeader",
+        "A spiritual leader from the Middle East.",
+        "You're a spiritual leader from the Middle East. "
+        "You provide insights grounded in religion, morality, and community service. ",
+    ),
+    (
+        "Artist",
+        "An artist from Africa.",
+        "You're an artist from Africa. "
+        "You view life through creative expression, storytelling, and collective memory. ",
+    ),
+    (
+        "Immigrant",
+        "An immigrant entrepreneur from Asia living in Canada.",
+        "You're an immigrant entrepreneur from Asia living in Canada. "
+        "You balance trandition with adaption. "
+        "You focus on family success, risk, and opportunity. ",
+    ),
+    (
+        "TaxiDriver",
+        "A Taxi Driver from the UK.",
+        "You're a taxi driver from London. "
+        "Your perspective is shaped by your interactions with people from around the globe ",
+    ),
+)
+
 async def get_agents() -> list[Agent]:
     """Return a list of agents that will participate in the group style discussion.
 
-    Feel free to add or remove agents.
+    Feel free to add or remove agents by editing _PERSONAS.
     """
-    farmer = ChatCompletionAgent(
-        name="Farmer",
-        description="A rural farmer from Southeast Asia.",
-        instructions=(
-            "You're a farmer from Southeast Asia. "
-            "Your life is deeply connected to land and family. "
-            "You value tradition and sustainability. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    developer = ChatCompletionAgent(
-        name="Developer",
-        description="An urban software developer from the United States.",
-        instructions=(
-            "You're a software developer from the United States. "
-            "Your life is fast-paced and technology-driven. "
-            "You value innovation, freedom, and work-life balance. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    teacher = ChatCompletionAgent(
-        name="Teacher",
-        description="A retired history teacher from Eastern Europe",
-        instructions=(
-            "You're a retired history teacher from Eastern Europe. "
-            "You bring historical and philosophical perspectives to discussions. "
-            "You value legacy, learning, and cultural continuity. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    activist = ChatCompletionAgent(
-        name="Activist",
-        description="A young activist from South America.",
-        instructions=(
-            "You're a young activist from South America. "
-            "You focus on social justice, environmental rights, and generational change. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    spiritual_leader = ChatCompletionAgent(
-        name="SpiritualLeader",
-        description="A spiritual leader from the Middle East.",
-        instructions=(
-            "You're a spiritual leader from the Middle East. "
-            "You provide insights grounded in religion, morality, and community service. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    artist = ChatCompletionAgent(
-        name="Artist",
-        description="An artist from Africa.",
-        instructions=(
-            "You're an artist from Africa. "
-            "You view life through creative expression, storytelling, and collective memory. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    immigrant = ChatCompletionAgent(
-        name="Immigrant",
-        description="An immigrant entrepreneur from Asia living in Canada.",
-        instructions=(
-            "You're an immigrant entrepreneur from Asia living in Canada. "
-            "You balance trandition with adaption. "
-            "You focus on family success, risk, and opportunity. "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
-    taxi_driver = ChatCompletionAgent(
-        name="TaxiDriver",
-        description="A Taxi Driver from the UK.",
-        instructions=(
-            "You're a taxi driver from London. "
-            "Your perspective is shaped by your interactions with people from around the globe "
-            "You are in a debate. Feel free to challenge the other participants with respect."
-        ),
-        service=AzureChatCompletion(env_file_path=".env"),
-    )
+    agents: list[Agent] = [
+        ChatCompletionAgent(
+            name=name,
+            description=description,
+            instructions=persona + _DEBATE_SUFFIX,
+            service=_get_chat_service(),
+        )
+        for name, description, persona in _PERSONAS
+    ]
     
     # Create Azure AI Search plugin
     try:
@@ -256,7 +314,7 @@ async def get_agents() -> list[Agent]:
                 "You value evidence-based arguments and factual accuracy. "
                 "You are in a debate. Feel free to challenge the other participants with respect and provide factual backing for your points."
             ),
-            service=AzureChatCompletion(env_file_path=".env"),
+            service=_get_chat_service(),
             # Add the search plugin to the kernel
             kernel=Kernel(),
         )
@@ -264,12 +322,12 @@ async def get_agents() -> list[Agent]:
         # Add the search plugin to the researcher's kernel
         researcher.kernel.add_plugin(search_plugin, plugin_name="AzureSearch")
         
-        return [farmer, developer, teacher, activist, spiritual_leader, artist, immigrant, taxi_driver, researcher]
+        return [*agents, researcher]
         
     except Exception as e:
         print(f"Warning: Could not initialize Azure AI Search plugin: {e}")
         print("Continuing without the researcher agent...")
-        return [farmer, developer, teacher, activist, spiritual_leader, artist, immigrant, taxi_driver]
+        return agents
 
 class ChatCompletionGroupChatManager(GroupChatManager):
     """A simple chat completion base group chat manager.
@@ -281,37 +339,67 @@ class ChatCompletionGroupChatManager(GroupChatManager):
 
     topic: str
 
+    # The response_format on each request already enforces the answer shape, so the prompts
+    # only carry the instruction itself.
     termination_prompt: str = (
-        "You are mediator that guides a discussion on the topic of '{{$topic}}'. "
-        "You need to determine if the discussion has reached a conclusion. "
-        "If you would like to end the discussion, please respond with True. Otherwise, respond with False."
+        "You mediate a discussion on '{{$topic}}'. "
+        "Decide whether it has reached a conclusion and should end."
     )
 
     selection_prompt: str = (
-        "You are mediator that guides a discussion on the topic of '{{$topic}}'. "
-        "You need to select the next participant to speak. "
-        "Here are the names and descriptions of the participants: "
+        "You mediate a discussion on '{{$topic}}'. Participants:\n"
         "{{$participants}}\n"
-        "Please respond with only the name of the participant you would like to select."
+        "Select the next speaker; the result must be exactly one participant name."
     )
 
     result_filter_prompt: str = (
-        "You are mediator that guides a discussion on the topic of '{{$topic}}'. "
-        "You have just concluded the discussion. "
-        "Please summarize the discussion and provide a closing statement."
+        "You mediate a discussion on '{{$topic}}' that has concluded. "
+        "Summarize it and give a closing statement."
     )
 
+    # Runtime caches are private attributes so pydantic never validates or copies them as fields.
+    _kernel: Kernel = PrivateAttr(default_factory=Kernel)
+    _termination_template: KernelPromptTemplate = PrivateAttr()
+    _selection_template: KernelPromptTemplate = PrivateAttr()
+    _result_filter_template: KernelPromptTemplate = PrivateAttr()
+    # Rendered prompts keyed on (template id, arguments); the topic and participants rarely change.
+    _rendered_prompts: dict[tuple[int, tuple], str] = PrivateAttr(default_factory=dict)
+
     def __init__(self, topic: str, service: ChatCompletionClientBase, **kwargs) -> None:
         """Initialize the group chat manager."""
         super().__init__(**kwargs)
         self.topic = topic
         self.service = service
 
-    async def _render_prompt(self, prompt: str, arguments: KernelArguments) -> str:
-        """Helper to render a prompt with arguments."""
-        prompt_template_config = PromptTemplateConfig(template=prompt)
-        prompt_template = KernelPromptTemplate(prompt_template_config=prompt_template_config)
-        return await prompt_template.render(Kernel(), arguments=arguments)
+        # The prompts are fixed for the manager's lifetime, so parse their templates once.
+        self._termination_template = self._compile_prompt(self.termination_prompt)
+        self._selection_template = self._compile_prompt(self.selection_prompt)
+        self._result_filter_template = self._compile_prompt(self.result_filter_prompt)
+
+    @staticmethod
+    def _compile_prompt(prompt: str) -> KernelPromptTemplate:
+        """Helper to build a reusable prompt template."""
+        return KernelPromptTemplate(prompt_template_config=PromptTemplateConfig(template=prompt))
+
+    async def _render_prompt(self, prompt_template: KernelPromptTemplate, arguments: KernelArguments) -> str:
+        """Helper to render a precompiled prompt template with arguments, reusing earlier renders."""
+        key = (id(prompt_template), tuple(arguments.items()))
+        rendered = self._rendered_prompts.get(key)
+        if rendered is None:
+            rendered = await prompt_template.render(self._kernel, arguments=arguments)
+            self._rendered_prompts[key] = rendered
+        return rendered
+
+    @staticmethod
+    def _build_prompt_history(system_prompt: str, chat_history: ChatHistory, instruction: str) -> ChatHistory:
+        """Helper to wrap the conversation in a mediator prompt without mutating the original history."""
+        return ChatHistory(
+            messages=[
+                ChatMessageContent(role=AuthorRole.SYSTEM, content=system_prompt),
+                *chat_history.messages,
+                ChatMessageContent(role=AuthorRole.USER, content=instruction),
+            ]
+        )
 
     @override
     async def should_request_user_input(self, chat_history: ChatHistory) -> BooleanResult:
@@ -335,22 +423,17 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         if should_terminate.result:
             return should_terminate
 
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.termination_prompt,
-                    KernelArguments(topic=self.topic),
-                ),
+        prompt_history = self._build_prompt_history(
+            await self._render_prompt(
+                self._termination_template,
+                KernelArguments(topic=self.topic),
             ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(role=AuthorRole.USER, content="Determine if the discussion should end."),
+            chat_history,
+            "Determine if the discussion should end.",
         )
 
         response = await self.service.get_chat_message_content(
-            chat_history,
+            prompt_history,
             settings=PromptExecutionSettings(response_format=BooleanResult),
         )
 
@@ -373,25 +456,20 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         The manager will select the next agent to speak after each agent message
         or human input (if applicable) if the conversation is not terminated.
         """
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.selection_prompt,
-                    KernelArguments(
-                        topic=self.topic,
-                        participants="\n".join([f"{k}: {v}" for k, v in participant_descriptions.items()]),
-                    ),
+        prompt_history = self._build_prompt_history(
+            await self._render_prompt(
+                self._selection_template,
+                KernelArguments(
+                    topic=self.topic,
+                    participants="\n".join([f"{k}: {v}" for k, v in participant_descriptions.items()]),
                 ),
             ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(role=AuthorRole.USER, content="Now select the next participant to speak."),
+            chat_history,
+            "Now select the next participant to speak.",
         )
 
         response = await self.service.get_chat_message_content(
-            chat_history,
+            prompt_history,
             settings=PromptExecutionSettings(response_format=StringResult),
         )
 
@@ -420,22 +498,17 @@ class ChatCompletionGroupChatManager(GroupChatManager):
         if not chat_history.messages:
             raise RuntimeError("No messages in the chat history.")
 
-        chat_history.messages.insert(
-            0,
-            ChatMessageContent(
-                role=AuthorRole.SYSTEM,
-                content=await self._render_prompt(
-                    self.result_filter_prompt,
-                    KernelArguments(topic=self.topic),
-                ),
+        prompt_history = self._build_prompt_history(
+            await self._render_prompt(
+                self._result_filter_template,
+                KernelArguments(topic=self.topic),
             ),
-        )
-        chat_history.add_message(
-            ChatMessageContent(role=AuthorRole.USER, content="Please summarize the discussion."),
+            chat_history,
+            "Please summarize the discussion.",
         )
 
         response = await self.service.get_chat_message_content(
-            chat_history,
+            prompt_history,
             settings=PromptExecutionSettings(response_format=StringResult),
         )
         string_with_reason = StringResult.model_validate_json(response.content or "{}")
@@ -447,11 +520,9 @@ class ChatCompletionGroupChatManager(GroupChatManager):
 
 async def agent_response_callback(messages) -> None:
     """Callback function to retrieve agent responses."""
-    if isinstance(messages, list):
-        for message in messages:
-            print(f"**{message.name}**\n{message.content}")
-    else:
-        print(f"**{messages.name}**\n{messages.content}")
+    if not isinstance(messages, list):
+        messages = (messages,)
+    sys.stdout.write("".join(f"**{message.name}**\n{message.content}\n" for message in messages))
 
 async def main():
     """Main function to run the agents."""
@@ -461,7 +532,7 @@ async def main():
         members=agents,
         manager=ChatCompletionGroupChatManager(
             topic="How should your government approach taxation?",
-            service=AzureChatCompletion(),
+            service=_get_chat_service(),
             max_rounds=10,
         ),
         agent_response_callback=agent_response_callback,
@@ -1,57 +1,90 @@
+import asyncio
+import io
 import os
 import json
+import sys
 from dotenv import load_dotenv
 
-from azure.identity import ClientSecretCredential
-from azure.core.credentials import AzureKeyCredential
-from azure.ai.projects import AIProjectClient
-from azure.ai.projects.models import AzureAISearchTool, ConnectionType
-from azure.search.documents import SearchClient
-# The response message content objects are part of the inference models
-from azure.ai.inference.models import UserMessage, MessageText, MessageTextContent
+from azure.identity.aio import ClientSecretCredential
+from azure.core.pipeline.transport import AioHttpTransport
+from azure.ai.projects.aio import AIProjectClient
+from azure.ai.projects.models import AgentStreamEvent, AzureAISearchTool, ConnectionType, ThreadMessage, ThreadRun
+
+AGENT_NAME = "IFRS-Search-Agent-Citations" # Identifies the agent to reuse across runs
+REQUIRED_ENV_VARS = ("CLIENT_ID", "CLIENT_SECRET", "TENANT_ID", "PROJECT_CONNECTION_STRING")
+DEFAULT_MAX_CONCURRENCY = 4
+
+def read_max_concurrency():
+    """Returns the AGENT_MAX_CONCURRENCY limit on in-flight agent queries, or None if it is invalid."""
+    value = os.getenv("AGENT_MAX_CONCURRENCY", str(DEFAULT_MAX_CONCURRENCY))
+    try:
+        max_concurrency = int(value)
+    except ValueError:
+        max_concurrency = 0
+    if max_concurrency < 1:
+        print(f"× Invalid AGENT_MAX_CONCURRENCY '{value}': expected an integer of at least 1.")
+        return None
+    return max_concurrency
 
 def initialize_clients():
-    """Initializes and returns the AIProjectClient."""
+    """Initializes and returns the credential and the AIProjectClient built on it."""
+    # Check every required setting up front so misconfiguration is reported before any SDK call.
+    env = os.environ
+    missing = [key for key in REQUIRED_ENV_VARS if not env.get(key)]
+    if missing:
+        print(f"× Missing required environment variables: {', '.join(missing)}")
+        return None, None
+
     try:
         credential = ClientSecretCredential(
-            client_id=os.getenv("CLIENT_ID"),
-            client_secret=os.getenv("CLIENT_SECRET"),
-            tenant_id=os.getenv("TENANT_ID")
+            client_id=env["CLIENT_ID"],
+            client_secret=env["CLIENT_SECRET"],
+            tenant_id=env["TENANT_ID"]
         )
        
+        # AIProjectClient builds a separate pipeline per operation group (agents, connections, ...);
+        # handing them one transport lets them share a single aiohttp session and connection pool.
         project_client = AIProjectClient.from_connection_string(
-            conn_str=os.getenv("PROJECT_CONNECTION_STRING"),
-            credential=credential
+            conn_str=env["PROJECT_CONNECTION_STRING"],
+            credential=credential,
+            transport=AioHttpTransport(),
+            # azure-core already retries 408/429/5xx (honouring Retry-After); bound it so a
+            # throttled service backs off briefly instead of stalling for minutes.
+            retry_total=5,
+            retry_backoff_factor=0.5
         )
         print("✓ Successfully initialized AIProjectClient")
-        return project_client
+        return credential, project_client
     except Exception as e:
         print(f"× Error initializing AIProjectClient: {str(e)}")
-        return None
+        return None, None
 
-def perform_simple_completion(project_client, model_deployment_name="gpt-4o-3"):
+async def perform_simple_completion(project_client, model_deployment_name="gpt-4o-3"):
     """Performs a simple chat completion."""
     if not project_client:
         return
 
+    # Only this helper needs the inference models, so keep them off the import path.
+    from azure.ai.inference.models import UserMessage
+
     try:
-        chat_client = project_client.inference.get_chat_completions_client()
-        response = chat_client.complete(
-            model=model_deployment_name,
-            messages=[UserMessage(content="How to be healthy in one sentence?")]
-        )
+        async with await project_client.inference.get_chat_completions_client() as chat_client:
+            response = await chat_client.complete(
+                model=model_deployment_name,
+                messages=[UserMessage(content="How to be healthy in one sentence?")]
+            )
         print("\nSimple Chat Completion Response:")
         print(response.choices[0].message.content)
     except Exception as e:
         print(f"An error occurred during simple chat completion: {str(e)}")
 
-def setup_search_tool(project_client, search_index_name="fin-apd-ifrs-index"):
+async def setup_search_tool(project_client, search_index_name="fin-apd-ifrs-index"):
     """Sets up and returns the Azure AI Search tool."""
     if not project_client:
         return None
 
     try:
-        search_conn = project_client.connections.get_default(
+        search_conn = await project_client.connections.get_default(
             connection_type=ConnectionType.AZURE_AI_SEARCH,
             include_credentials=True
         )
@@ -74,8 +107,30 @@ def setup_search_tool(project_client, search_index_name="fin-apd-ifrs-index"):
         print(f"× Error setting up search tool: {str(e)}")
         return None
 
-def create_agent_with_tool(project_client, model_deployment_name, ai_search_tool):
-    """Creates an agent with the provided search tool and instructions to generate citations."""
+async def find_agent_by_name(project_client, name):
+    """Returns the first existing agent with the given name, or None if there is none."""
+    after = None
+    while True:
+        page = await project_client.agents.list_agents(limit=100, after=after)
+        agent = next((a for a in page.data if a.name == name), None)
+        if agent or not page.has_more:
+            return agent
+        after = page.last_id
+
+def search_index_settings(tool_resources):
+    """Returns the connection id, index name and top_k of each Azure AI Search index in the given tool resources."""
+    search = getattr(tool_resources, "azure_ai_search", None)
+    return sorted(
+        (index.index_connection_id, index.index_name, index.top_k)
+        for index in (getattr(search, "index_list", None) or [])
+    )
+
+async def create_agent_with_tool(project_client, model_deployment_name, ai_search_tool):
+    """Creates an agent with the provided search tool and instructions to generate citations.
+
+    An agent left over from an earlier run with the same name is reused instead, and
+    updated in place if its model, instructions or search index settings no longer match.
+    """
     if not project_client or not ai_search_tool:
         return None
    
@@ -91,9 +146,27 @@ def create_agent_with_tool(project_client, model_deployment_name, ai_search_tool
             "automatically generated from the documents you use."
         )
 
-        agent = project_client.agents.create_agent(
+        agent = await find_agent_by_name(project_client, AGENT_NAME)
+        if agent and agent.model == model_deployment_name and agent.instructions == instructions and \
+                search_index_settings(agent.tool_resources) == search_index_settings(ai_search_tool.resources):
+            print(f"✓ Reusing agent '{agent.name}' with ID: {agent.id}")
+            return agent
+
+        if agent:
+            agent = await project_client.agents.update_agent(
+                agent_id=agent.id,
+                model=model_deployment_name,
+                instructions=instructions,
+                tools=ai_search_tool.definitions,
+                tool_resources=ai_search_tool.resources,
+                headers={"x-ms-enable-preview": "true"}
+            )
+            print(f"✓ Agent '{agent.name}' updated with ID: {agent.id}")
+            return agent
+
+        agent = await project_client.agents.create_agent(
             model=model_deployment_name,
-            name="IFRS-Search-Agent-Citations", # Using a new name to avoid conflicts
+            name=AGENT_NAME,
             instructions=instructions,
             tools=ai_search_tool.definitions,
             tool_resources=ai_search_tool.resources,
@@ -102,8 +175,6 @@ def create_agent_with_tool(project_client, model_deployment_name, ai_search_tool
         print(f"✓ Agent '{agent.name}' created with ID: {agent.id}")
         return agent
     except Exception as e:
-        # If an agent with this name already exists, you might get an error.
-        # Consider adding logic to find and reuse an existing agent if needed.
         print(f"× Error creating agent: {str(e)}")
         return None
 
@@ -113,7 +184,7 @@ def sdk_object_serializer(o):
         return vars(o)
     raise TypeError(f"Object of type {o.__class__.__name__} is not JSON serializable")
 
-def run_agent_query(project_client, agent, question: str):
+async def run_agent_query(project_client, agent, question: str):
     """
     Runs a query and prints the raw annotation objects using a custom JSON serializer.
     """
@@ -121,91 +192,141 @@ def run_agent_query(project_client, agent, question: str):
         print("× Cannot run agent query: Client or agent not initialized.")
         return
 
+    # Queries run concurrently, so the whole report for this question is collected in a buffer
+    # and written to stdout in a single call, even when the query fails part way through.
+    buf = io.StringIO()
     try:
         # Steps 1-3 are unchanged
-        thread = project_client.agents.create_thread()
-        print(f"\n📝 Created thread, ID: {thread.id} for question: '{question}'")
+        thread = await project_client.agents.create_thread()
+        print(f"\n📝 Created thread, ID: {thread.id} for question: '{question}'", file=buf)
 
-        project_client.agents.create_message(
+        await project_client.agents.create_message(
             thread_id=thread.id,
             role="user",
             content=question
         )
 
-        run = project_client.agents.create_and_process_run(
+        # Stream the run rather than polling it; completed messages arrive as events,
+        # so the reply does not have to be fetched again with list_messages.
+        run = None
+        completed_messages = []
+        async with await project_client.agents.create_stream(
             thread_id=thread.id,
             agent_id=agent.id
-        )
-        print(f"🤖 Agent run status: {run.status}")
+        ) as stream:
+            async for event_type, event_data, _ in stream:
+                if isinstance(event_data, ThreadRun):
+                    run = event_data
+                elif isinstance(event_data, ThreadMessage) and event_type == AgentStreamEvent.THREAD_MESSAGE_COMPLETED:
+                    completed_messages.append(event_data)
+                elif event_type == AgentStreamEvent.ERROR:
+                    print(f"⚠️ Stream error: {event_data}", file=buf)
+                    return
+
+        if run is None:
+            print("⚠️ Run error: the stream ended without reporting a run.", file=buf)
+            return
+
+        print(f"🤖 Agent run status: {run.status}", file=buf)
 
         if run.last_error:
-            print(f"⚠️ Run error: {run.last_error.message}")
+            print(f"⚠️ Run error: {run.last_error.message}", file=buf)
             return
 
-        # Step 4: Get the agent's response and inspect annotations
-        msg_list = project_client.agents.list_messages(thread_id=thread.id, order_by="created_at desc")
-       
+        # Step 4: Inspect the agent's latest response and its annotations
+        # Set COMPACT_ANNOTATIONS=1 to print a one-line summary per citation instead of the raw objects.
+        compact_annotations = os.getenv("COMPACT_ANNOTATIONS", "").strip().lower() not in ("", "0", "false", "no")
         assistant_responded = False
-        for m in msg_list.data:
+        for m in reversed(completed_messages):
             if m.role == "assistant" and m.content:
-                print("\n✅ Assistant Response:")
+                print(f"\n✅ Assistant Response to '{question}':", file=buf)
                 
                 for content_block in m.content:
                     if hasattr(content_block, "text"):
                         text_value = content_block.text.value
                         annotations = content_block.text.annotations
                         
-                        print(text_value)
+                        print(text_value, file=buf)
                         
-                        if annotations:
-                            print("\n🔍 Raw Annotation Objects (for inspection):")
+                        if annotations and compact_annotations:
+                            print("\n🔍 Annotations:", file=buf)
+                            for i, annotation in enumerate(annotations):
+                                print(f"[{i+1}] {annotation.text}", file=buf)
+                        elif annotations:
+                            print("\n🔍 Raw Annotation Objects (for inspection):", file=buf)
                             for i, annotation in enumerate(annotations):
-                                print(f"--- Annotation [{i+1}] ---")
+                                print(f"--- Annotation [{i+1}] ---", file=buf)
                                 
                                 # --- THIS IS THE KEY CHANGE ---
                                 # We pass the original annotation object directly to json.dumps
                                 # and provide our custom serializer via the 'default' parameter.
-                                print(json.dumps(annotation, indent=2, default=sdk_object_serializer))
+                                print(json.dumps(annotation, indent=2, default=sdk_object_serializer), file=buf)
                                 # ------------------------------
                         else:
-                            print("\n- No annotations provided for this response.")
+                            print("\n- No annotations provided for this response.", file=buf)
 
                 assistant_responded = True
                 break
        
         if not assistant_responded:
-            print("   - No response from assistant found in the thread.")
+            print("   - No response from assistant found in the thread.", file=buf)
 
     except Exception as e:
-        print(f"× An error occurred while running agent query for '{question}': {str(e)}")
-
-
-def main():
-    """Main function to orchestrate the script's operations."""
-    load_dotenv('.env')
-    project_client = initialize_clients()
-    if not project_client:
-        return
+        print(f"× An error occurred while running agent query for '{question}': {str(e)}", file=buf)
+    finally:
+        sys.stdout.write(buf.getvalue())
 
-    model_deployment_name = "gpt-4o-3"
-    perform_simple_completion(project_client, model_deployment_name)
 
-    s_index_name = "fin-apd-ifrs-index"
-    ai_search_tool = setup_search_tool(project_client, s_index_name)
+async def run_search_agent_queries(project_client, model_deployment_name, search_index_name, questions, max_concurrency):
+    """Sets up the search agent and runs the given questions against it concurrently."""
+    ai_search_tool = await setup_search_tool(project_client, search_index_name)
    
     if not ai_search_tool:
         print("× Agent creation skipped due to search tool setup failure.")
         return
 
     # Create the agent with instructions for citations
-    agent = create_agent_with_tool(project_client, model_deployment_name, ai_search_tool)
+    agent = await create_agent_with_tool(project_client, model_deployment_name, ai_search_tool)
 
     if agent:
         print("\n--- Running Agent Queries ---")
-        run_agent_query(project_client, agent, "What is the purpose of IFRS 17?")
-        run_agent_query(project_client, agent, "Which insurance contracts does IFRS 17 apply to?")
+        # The queries are independent, so run them concurrently, each in its own agent thread,
+        # but cap how many are in flight so the search service is not throttled.
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def run_limited(question):
+            async with semaphore:
+                await run_agent_query(project_client, agent, question)
+
+        await asyncio.gather(*(run_limited(question) for question in questions))
     else:
         print("× Skipping agent queries as agent creation failed.")
 
+async def main():
+    """Main function to orchestrate the script's operations."""
+    load_dotenv('.env')
+    # Validate the settings before initialize_clients so a bad value stops the run before any SDK call.
+    max_concurrency = read_max_concurrency()
+    if max_concurrency is None:
+        return
+    credential, project_client = initialize_clients()
+    if not project_client:
+        return
+
+    # Close the clients, and with them their connection pools, once the run is over.
+    async with credential, project_client:
+        model_deployment_name = "gpt-4o-3"
+        s_index_name = "fin-apd-ifrs-index"
+        questions = [
+            "What is the purpose of IFRS 17?",
+            "Which insurance contracts does IFRS 17 apply to?",
+        ]
+
+        # The simple completion does not depend on the search agent, so run both side by side.
+        await asyncio.gather(
+            perform_simple_completion(project_client, model_deployment_name),
+            run_search_agent_queries(project_client, model_deployment_name, s_index_name, questions, max_concurrency),
+        )
+
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())